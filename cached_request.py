@@ -1,96 +1,139 @@
 import time
-import hashlib
+import asyncio
+import gzip
+import os
+import zlib
 from pathlib import Path
 from typing import Optional, Dict
 import httpx
-from datetime import datetime, timedelta
+import xxhash
 import logging
-import re
 
 CACHE_DIR = "cache"
 
 logger = logging.getLogger(__name__)
 
+class AsyncTokenBucket:
+    """Token bucket rate limiter that waits on the event loop instead of blocking it"""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+
+    async def acquire(self) -> None:
+        """Take a token, sleeping until one is available"""
+        # Refill lazily from the time elapsed since the last acquire
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+        # Reserve the token before sleeping so concurrent callers queue up behind it
+        self.tokens -= 1
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+
 class CachedRequest:
     """A request client with caching capabilities"""
     
     def __init__(self, rate_limit_delay: float = 0.1):
         self.rate_limit_delay = rate_limit_delay
-        self.last_request_time = 0
+        self._buckets: Dict[str, AsyncTokenBucket] = {}
         self.cache_dir = Path(CACHE_DIR)
+        self._client: Optional[httpx.AsyncClient] = None
 
         # mkdir if not exists (cache dir is a string)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         
     def _get_cache_path(self, url: str, params: Optional[Dict] = None) -> Path:
         """Get the cache file path for a URL and optional parameters"""
-        # Create a hash of the URL and params
+        # The hash of the URL and params alone is a unique, filesystem-safe name
         key = url
         if params:
             key += "_" + "_".join(f"{k}-{v}" for k, v in sorted(params.items()))
-        safe_path = re.sub(r'[^a-zA-Z0-9_-]', '_', key)
-        hash_name = hashlib.md5(key.encode()).hexdigest()
-        return self.cache_dir / f"{safe_path}_{hash_name}.txt"
+        hash_name = xxhash.xxh3_64_hexdigest(key.encode())
+        return self.cache_dir / f"{hash_name}.gz"
         
     def _is_cache_valid(self, cache_path: Path, max_age_hours: int = 24) -> bool:
         """Check if the cache file is still valid"""
-        if not cache_path.exists():
+        try:
+            mtime = os.stat(cache_path).st_mtime
+        except FileNotFoundError:
             return False
-        file_mtime = datetime.fromtimestamp(cache_path.stat().st_mtime)
-        return (datetime.now() - file_mtime) < timedelta(hours=max_age_hours)
+        return (time.time() - mtime) < max_age_hours * 3600
         
-    def _load_cache(self, cache_path: Path) -> Optional[str]:
-        """Load data from cache file"""
+    def _load_cache(self, cache_path: Path) -> Optional[bytes]:
+        """Load raw response bytes from a gzip-compressed cache file"""
         try:
-            return cache_path.read_text()
-        except OSError as e:
+            return gzip.decompress(cache_path.read_bytes())
+        except (OSError, EOFError, zlib.error) as e:
+            # A corrupt file is treated as a miss and overwritten by the next fetch
             logger.warning(f"Failed to load cache from {cache_path}: {e}")
             return None
             
-    def _save_cache(self, cache_path: Path, data: str) -> None:
-        """Save data to cache file"""
+    def _save_cache(self, cache_path: Path, data: bytes) -> None:
+        """Save raw response bytes to a gzip-compressed cache file"""
         try:
-            cache_path.write_text(data)
+            cache_path.write_bytes(gzip.compress(data))
             logger.debug(f"Saved cache to {cache_path}")
         except OSError as e:
             logger.error(f"Failed to save cache to {cache_path}: {e}")
             
-    def _rate_limit(self) -> None:
-        """Enforce rate limiting between requests"""
-        current_time = time.time()
-        if current_time - self.last_request_time < self.rate_limit_delay:
-            time.sleep(self.rate_limit_delay - (current_time - self.last_request_time))
-        self.last_request_time = time.time()
+    async def _rate_limit(self, url: str) -> None:
+        """Enforce rate limiting between requests to the same host"""
+        if self.rate_limit_delay <= 0:
+            return
+        host = httpx.URL(url).host
+        if (bucket := self._buckets.get(host)) is None:
+            bucket = self._buckets[host] = AsyncTokenBucket(rate=1 / self.rate_limit_delay)
+        await bucket.acquire()
         
-    def get(self, url: str, params: Optional[Dict] = None, 
-            headers: Optional[Dict] = None, cache: bool = True,
-            max_age_hours: int = 24) -> httpx.Response:
+    async def _get_client(self) -> httpx.AsyncClient:
+        """Get the shared HTTP client, creating it on first use"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=True,
+                timeout=30.0,
+                limits=httpx.Limits(max_keepalive_connections=32)
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the shared HTTP client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def aget(self, url: str, params: Optional[Dict] = None,
+                   headers: Optional[Dict] = None, cache: bool = True,
+                   max_age_hours: int = 24) -> httpx.Response:
         """Make a GET request with caching"""
         cache_path = self._get_cache_path(url, params)
         
         # Try to load from cache first
         if cache and self._is_cache_valid(cache_path, max_age_hours):
-            if cached_text := self._load_cache(cache_path):
+            if cached_bytes := self._load_cache(cache_path):
                 logger.debug(f"Cache hit for {url}")
                 return httpx.Response(
                     status_code=200,
-                    content=cached_text.encode(),
+                    content=cached_bytes,
                     request=httpx.Request("GET", url)
                 )
                 
         # Rate limit before making request
-        self._rate_limit()
+        await self._rate_limit(url)
         
         # Make the request
         try:
-            with httpx.Client(timeout=30.0) as client:
-                response = client.get(url, params=params, headers=headers)
-                
-                # Cache successful responses
-                if cache and response.status_code == 200:
-                    self._save_cache(cache_path, response.text)
-                        
-                return response
+            client = await self._get_client()
+            response = await client.get(url, params=params, headers=headers)
+            
+            # Cache successful responses
+            if cache and response.status_code == 200:
+                self._save_cache(cache_path, response.content)
+                    
+            return response
         except httpx.RequestError as e:
             return httpx.Response(
                 status_code=500,
@@ -1,8 +1,11 @@
-from typing import Dict, List, Optional, Tuple, Generator
+from typing import Dict, Iterable, List, Optional, Tuple, Generator
 from cached_request import CachedRequest
+import asyncio
 import logging
-import json
+import orjson
 import itertools
+import sys
+from pattern_matching import build_pattern_automaton, first_declared_match
 logger = logging.getLogger("uvicorn")
 
 class ChannelManager:
@@ -11,19 +14,43 @@ class ChannelManager:
         "crystools": "https://github.com/crystian/ComfyUI-Crystools"
     }
 
+    # Lowercased and interned once at class load, then compiled into a single automaton
+    _KNOWN_NODES_LC = tuple((sys.intern(pattern.lower()), repo) for pattern, repo in KNOWN_NODES.items())
+    _KNOWN_NODES_AC = build_pattern_automaton(_KNOWN_NODES_LC)
+
+    # Source of version tags; shared so tags are unique across instances
+    _versions = itertools.count(1)
+
     CHANNELS_URL = "https://raw.githubusercontent.com/ltdrdata/ComfyUI-Manager/main/channels.list.template"
 
     def __init__(self):
         self.requester = CachedRequest()
         self.repo_mappings = {}
-        self.populate_repo_mappings()
+        # Changes whenever repo_mappings is repopulated, so results derived from it can be invalidated
+        self.version_tag = "0"
+
+    def to_state(self) -> Dict:
+        """Snapshot of the resolved mappings, cheap to pickle into worker processes"""
+        return {"repo_mappings": self.repo_mappings, "version_tag": self.version_tag}
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "ChannelManager":
+        """Rebuild a ChannelManager from to_state() without fetching any channels"""
+        channel_manager = cls()
+        channel_manager.repo_mappings = state["repo_mappings"]
+        channel_manager.version_tag = state["version_tag"]
+        return channel_manager
 
-    def get_channel_urls(self) -> Dict[str, str]:
+    async def aclose(self) -> None:
+        """Release network resources held by the requester"""
+        await self.requester.aclose()
+
+    async def get_channel_urls(self) -> Dict[str, str]:
         """Parse channels.list.template into a dict of channel URLs"""
-        response = self.requester.get(self.CHANNELS_URL)
+        response = await self.requester.aget(self.CHANNELS_URL)
         content = response.text
         if response.headers.get('content-type', '').startswith('application/json'):
-            content = json.dumps(response.json())
+            content = orjson.dumps(orjson.loads(response.content)).decode()
             
         channels = {}
         for line in content.splitlines():
@@ -37,25 +64,32 @@ class ChannelManager:
   
     def find_repo_by_pattern(self, node_type: str) -> Optional[str]:
         """Find repository URL by matching node type against known patterns"""
-        for pattern, repo in self.KNOWN_NODES.items():
-            if pattern.lower() in node_type.lower():
-                logger.debug(f"Matched node {node_type} to repo {repo} via pattern {pattern}")
-                return repo
+        match = first_declared_match(self._KNOWN_NODES_AC, node_type.lower())
+        if match:
+            pattern, repo = match
+            logger.debug(f"Matched node {node_type} to repo {repo} via pattern {pattern}")
+            return repo
         return None
 
-    def get_node_mappings(self, channel_url: str) -> Dict[str, List]:
+    async def get_node_mappings(self, channel_url: str) -> Dict[str, List]:
         """Get node->repo mappings from a channel"""
         url = f"{channel_url}/extension-node-map.json"
         logger.debug(f"Fetching node mappings from {url}")
-        response = self.requester.get(url)
-        return response.json()
+        response = await self.requester.aget(url)
+        return orjson.loads(response.content)
 
-    def populate_repo_mappings(self):
-        channels = self.get_channel_urls()
+    async def populate_repo_mappings(self):
+        channels = await self.get_channel_urls()
         repo_map = {}  # node_type -> repo_url mapping
 
-        for channel_name, channel_url in channels.items():
-            mappings = self.get_node_mappings(channel_url)
+        # Fetch all channels concurrently; one failing channel shouldn't sink the rest
+        tasks = [self.get_node_mappings(channel_url) for channel_url in channels.values()]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        for channel_name, mappings in zip(channels, results):
+            if isinstance(mappings, Exception):
+                logger.error(f"Error fetching node mappings for channel {channel_name}: {mappings}")
+                continue
             # logger.info(f"Mappings: {mappings}")
             for repo_url, nodes_info in mappings.items():
                 if isinstance(nodes_info, list) and len(nodes_info) >= 1:
@@ -64,6 +98,7 @@ class ChannelManager:
                         repo_map[node] = repo_url
 
         self.repo_mappings = repo_map
+        self.version_tag = str(next(self._versions))
 
     def get_repo_from_node_type(self, node_type: str) -> Optional[str]:
         """Get repository URL from node type"""
@@ -76,3 +111,7 @@ class ChannelManager:
             logger.warning(f"No repo found for node type {node_type}")
 
         return repo
+
+    def get_repos_for_types(self, node_types: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Get repository URLs for a batch of node types, resolving each distinct type once"""
+        return {node_type: self.get_repo_from_node_type(node_type) for node_type in set(node_types)}
@@ -4,7 +4,7 @@ from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from sse_starlette.sse import EventSourceResponse
 from contextlib import asynccontextmanager
-import json
+import orjson
 from typing import Dict, Any, AsyncIterator
 from channels import ChannelManager
 import logging
@@ -12,7 +12,7 @@ from uvicorn.logging import logging
 from pathlib import Path
 from model_path_inference import ModelPathInference
 from model_finder import ModelFinder
-from workflow_processor import extract_nodes, transform_nodes_data, clone_repos
+from workflow_processor import get_nodes_data, clone_repos
 import time
 
 logger = logging.getLogger("uvicorn")
@@ -22,6 +22,7 @@ class AppState:
         self.config: Dict[str, Any] = {}
         self.is_initialized: bool = False
         self.workflow_storage: Dict[str, Any] = {}
+        self.model_path_inference = ModelPathInference(Path("custom_nodes"))
 
     async def initialize(self):
         """Initialize application state."""
@@ -29,8 +30,9 @@ class AppState:
             return
         
         self.channel_manager = ChannelManager()
+        await self.channel_manager.populate_repo_mappings()
         self.model_finder = ModelFinder()
-        await self.model_finder.setup()
+        await self.model_path_inference.prewarm()
 
         self.is_initialized = True
 
@@ -40,6 +42,7 @@ class AppState:
         self.config.clear()
         self.workflow_storage.clear()
         await self.model_finder.cleanup()
+        await self.channel_manager.aclose()
 
 # Create a global state instance
 app_state = AppState()
@@ -76,18 +79,17 @@ async def process_workflow(workflow_data: dict) -> AsyncIterator[str]:
     """Process workflow and yield progress updates."""
     try:
         # Extract and transform nodes
-        message = json.dumps({"status": "extracting", "message": "Extracting nodes...", "progress": 0})
+        message = orjson.dumps({"status": "extracting", "message": "Extracting nodes...", "progress": 0}).decode()
         logger.debug(f"Sending message: {message}")
         yield message
         
-        nodes = extract_nodes(workflow_data, app_state.channel_manager)
-        transformed_data = transform_nodes_data(nodes)
+        transformed_data = get_nodes_data(workflow_data, app_state.channel_manager)
         
         # delay 1 second
         # await asyncio.sleep(1)
 
         # Clone repositories
-        message = json.dumps({"status": "cloning", "message": "Cloning repositories...", "progress": 25})
+        message = orjson.dumps({"status": "cloning", "message": "Cloning repositories...", "progress": 25}).decode()
         logger.debug(f"Sending message: {message}")
         yield message
         
@@ -96,25 +98,43 @@ async def process_workflow(workflow_data: dict) -> AsyncIterator[str]:
         # await asyncio.sleep(1)
         
         # Infer model paths
-        message = json.dumps({"status": "inferring", "message": "Inferring model paths...", "progress": 50})
+        message = orjson.dumps({"status": "inferring", "message": "Inferring model paths...", "progress": 50}).decode()
         logger.debug(f"Sending message: {message}")
         yield message
         
-        model_path_inference = ModelPathInference(Path("custom_nodes"))
-        model_paths = await model_path_inference.infer_model_paths(transformed_data)
+        model_paths = await app_state.model_path_inference.infer_model_paths(transformed_data)
         transformed_data.update(model_paths)
         
-        # Find models online
+        # Find models online, running up to 8 searches concurrently
         total_models = len(transformed_data["models"])
-        for i, model in enumerate(transformed_data["models"], 1):
-            message = json.dumps({
-                "status": "searching",
-                "message": f"Finding model {i}/{total_models}: {model['filename']}",
-                "progress": (i / total_models) * 100
-            })
-            logger.debug(f"Sending message: {message}")
-            yield message
-            model["url"] = await app_state.model_finder.find_model_online(model["filename"])
+        semaphore = asyncio.Semaphore(8)
+        searched: asyncio.Queue = asyncio.Queue()
+
+        async def find_model(model: dict) -> None:
+            try:
+                async with semaphore:
+                    model["url"] = await app_state.model_finder.find_model_online(model["filename"])
+            finally:
+                await searched.put(model)
+
+        tasks = [asyncio.create_task(find_model(model)) for model in transformed_data["models"]]
+        try:
+            # Report progress as searches complete
+            for i in range(1, total_models + 1):
+                model = await searched.get()
+                message = orjson.dumps({
+                    "status": "searching",
+                    "message": f"Searched model {i}/{total_models}: {model['filename']}",
+                    "progress": (i / total_models) * 100
+                }).decode()
+                logger.debug(f"Sending message: {message}")
+                yield message
+
+            # Surface any search that raised
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
         
         # Create summary of custom nodes and models
         summary = {
@@ -123,23 +143,23 @@ async def process_workflow(workflow_data: dict) -> AsyncIterator[str]:
         }
         
         # Send final data
-        message = json.dumps({
+        message = orjson.dumps({
             "status": "complete",
             "message": "Processing complete",
             "data": summary
-        })
+        }).decode()
 
         logger.debug(f"Sending final message: {message}")
         yield message
         
     except Exception as e:
         logger.error(f"Error processing workflow: {e}")
-        message = json.dumps({"status": "error", "message": str(e)})
+        message = orjson.dumps({"status": "error", "message": str(e)}).decode()
         logger.debug(f"Sending error message: {message}")
         yield message
 
 @app.post("/api/upload")
 async def upload_file(file: UploadFile = File(...)):
     contents = await file.read()
-    workflow_data = json.loads(contents)
+    workflow_data = orjson.loads(contents)
     return EventSourceResponse(process_workflow(workflow_data))
@@ -1,11 +1,14 @@
 import ast
+import ahocorasick
+import orjson
 import logging
 from pathlib import Path
-from typing import Dict, List, Optional, Set
+from typing import Dict, Iterator, List, Optional, Tuple, TypedDict
 from dataclasses import dataclass
 import asyncio
 import os
-from concurrent.futures import ThreadPoolExecutor
+from process_pool import process_pool
+from pattern_matching import build_pattern_automaton, first_declared_match
 
 logger = logging.getLogger("uvicorn")
 
@@ -16,12 +19,19 @@ class ModelInfo:
     required_by: List[str]
     node_info: Optional[Dict] = None
 
+class FileAnalysis(TypedDict):
+    """Per-file analysis result, as stored in the AST cache"""
+    class_folders: Dict[str, Dict[str, str]]
+    node_class_mappings: Dict[str, str]
+
 class NodeVisitor(ast.NodeVisitor):
-    """Base visitor for finding model folder requirements in node classes."""
+    """Base visitor for finding model folder requirements in node classes
+    and the NODE_CLASS_MAPPINGS display names in a single traversal."""
     
     def __init__(self, source_file: Path):
         self.source_file = source_file
         self.class_folders: Dict[str, Dict[str, str]] = {}
+        self.node_class_mappings: Dict[str, str] = {}
         self.current_class: Optional[str] = None
         
     def visit_ClassDef(self, node: ast.ClassDef) -> None:
@@ -39,6 +49,20 @@ class NodeVisitor(ast.NodeVisitor):
                 
         self.generic_visit(node)
         
+    def visit_Assign(self, node: ast.Assign) -> None:
+        """Collect display name -> class name pairs from NODE_CLASS_MAPPINGS assignments."""
+        if (len(node.targets) == 1 and
+            isinstance(node.targets[0], ast.Name) and
+            node.targets[0].id == "NODE_CLASS_MAPPINGS" and
+            isinstance(node.value, ast.Dict)):
+            
+            # Extract key-value pairs from the dictionary
+            for key, value in zip(node.value.keys, node.value.values):
+                if isinstance(key, ast.Constant) and isinstance(value, ast.Name):
+                    self.node_class_mappings[key.value] = value.id
+                    
+        self.generic_visit(node)
+        
     def visit_Call(self, node: ast.Call) -> None:
         """Find folder_paths.get_filename_list calls and extract the folder name."""
         try:
@@ -65,6 +89,70 @@ class NodeVisitor(ast.NodeVisitor):
         """Find folder requirements in a method body."""
         self.generic_visit(node)
 
+class _RecordCollector(logging.Handler):
+    """Buffers log records in an analysis worker so the parent can emit them through its own handlers"""
+
+    def __init__(self):
+        super().__init__()
+        self.records: List[logging.LogRecord] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record)
+
+    def drain(self) -> List[logging.LogRecord]:
+        records, self.records = self.records, []
+        return records
+
+# Log collector of an analysis worker, set once per process by _init_analysis_worker
+_worker_log_collector: Optional[_RecordCollector] = None
+
+def _init_analysis_worker(level: int) -> None:
+    # Workers are not forked, so they never see uvicorn's logging config; buffer records for the
+    # parent instead, and only there so nothing is emitted twice
+    global _worker_log_collector
+    _worker_log_collector = _RecordCollector()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(_worker_log_collector)
+    logger.setLevel(level)
+    logger.propagate = False
+
+def _analyze_file_proc(path_str: str) -> Tuple[FileAnalysis, List[logging.LogRecord]]:
+    """Analyze a file in a worker process, returning the analysis along with the records it logged.
+
+    Module-level so it can be dispatched to a ProcessPoolExecutor."""
+    analysis = _analyze_file(path_str)
+    return analysis, _worker_log_collector.drain()
+
+def _analyze_file(path_str: str) -> FileAnalysis:
+    """Read and parse a Python file once, collecting folder requirements and NODE_CLASS_MAPPINGS."""
+    file_path = Path(path_str)
+    analysis: FileAnalysis = {"class_folders": {}, "node_class_mappings": {}}
+    try:
+        with open(file_path, "rb") as f:
+            content = f.read()
+
+        # Quick byte-level checks before parsing; ast.parse is far slower than a substring scan
+        has_folders = b"INPUT_TYPES" in content and b"get_filename_list" in content
+        if not has_folders and b"NODE_CLASS_MAPPINGS" not in content:
+            return analysis
+
+        # One parse, one traversal for both folder requirements and mappings.
+        # ast.parse decodes the bytes itself, honouring any coding declaration.
+        tree = ast.parse(content)
+        visitor = NodeVisitor(file_path)
+        visitor.visit(tree)
+
+        if has_folders and visitor.class_folders:
+            logger.info(f"Found {len(visitor.class_folders)} class folders in {file_path}")
+            analysis["class_folders"] = visitor.class_folders
+        analysis["node_class_mappings"] = visitor.node_class_mappings
+            
+    except Exception as e:
+        logger.error(f"Error analyzing {file_path}: {e}")
+    
+    return analysis
+
 class ModelPathInference:
     """Main class for inferring model paths"""
     
@@ -81,121 +169,130 @@ class ModelPathInference:
         "t2i": "checkpoints",  # text to image models are usually checkpoints
         "sd": "checkpoints",   # stable diffusion models
     }
+
+    # MODEL_PATTERNS compiled into a single automaton, built on first instantiation
+    _MODEL_AC: Optional[ahocorasick.Automaton] = None
     
     def __init__(self, custom_nodes_path: Path):
         self.custom_nodes_path = custom_nodes_path
+        if ModelPathInference._MODEL_AC is None:
+            ModelPathInference._MODEL_AC = build_pattern_automaton(
+                (pattern.lower(), folder) for pattern, folder in self.MODEL_PATTERNS.items())
         self.node_class_folders: Dict[str, Dict[str, str]] = {}
-        self.required_node_types: Set[str] = set()
         self.node_class_mappings: Dict[str, str] = {}
-        
-    def _load_node_class_mappings(self) -> None:
-        """Load NODE_CLASS_MAPPINGS from Python files to map display names to class names."""
+        self._ast_cache_path = Path("cache/.ast_cache.json")
+        self._ast_cache: Dict[str, FileAnalysis] = self._load_ast_cache()
+        self._analysis_lock = asyncio.Lock()
+
+    def _load_ast_cache(self) -> Dict[str, FileAnalysis]:
+        """Load per-file analysis results from the previous run."""
         try:
-            for file_path in self.custom_nodes_path.rglob("*.py"):
-                with open(file_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-                    if "NODE_CLASS_MAPPINGS" not in content:
-                        continue
-                    
-                    tree = ast.parse(content)
-                    for node in ast.walk(tree):
-                        if (isinstance(node, ast.Assign) and 
-                            len(node.targets) == 1 and
-                            isinstance(node.targets[0], ast.Name) and
-                            node.targets[0].id == "NODE_CLASS_MAPPINGS" and
-                            isinstance(node.value, ast.Dict)):
-                            
-                            # Extract key-value pairs from the dictionary
-                            for key, value in zip(node.value.keys, node.value.values):
-                                if isinstance(key, ast.Constant) and isinstance(value, ast.Name):
-                                    self.node_class_mappings[key.value] = value.id
-                            
+            return orjson.loads(self._ast_cache_path.read_bytes())
+        except FileNotFoundError:
+            return {}
         except Exception as e:
-            logger.error(f"Error loading NODE_CLASS_MAPPINGS: {e}")
+            logger.error(f"Error loading AST cache: {e}")
+            return {}
 
-    def _find_python_files(self) -> List[Path]:
-        """Find all Python files in the custom nodes directory."""
-        return [
-            path for path in self.custom_nodes_path.rglob("*.py")
-            if not any(part.startswith(".") for part in path.parts)
-        ]
-
-    def _analyze_file(self, file_path: Path) -> Dict[str, Dict[str, str]]:
-        """Analyze a single Python file for node classes and their folder requirements."""
+    def _save_ast_cache(self, live_keys: List[str]) -> None:
+        """Persist per-file analysis results for the next run, dropping stale entries."""
+        self._ast_cache = {key: self._ast_cache[key] for key in live_keys}
         try:
-            # Quick check for INPUT_TYPES before parsing
-            with open(file_path, "r", encoding="utf-8") as f:
-                content = f.read()
-                if "INPUT_TYPES" not in content:
-                    return {}
-
-            # Only parse if INPUT_TYPES is found
-            tree = ast.parse(content)
-            visitor = NodeVisitor(file_path)
-            visitor.visit(tree)
-            
-            if visitor.class_folders:
-                logger.info(f"Found {len(visitor.class_folders)} class folders in {file_path}")
-                return visitor.class_folders
-                
+            self._ast_cache_path.parent.mkdir(parents=True, exist_ok=True)
+            # Constant keys found in source aren't guaranteed to be strings
+            self._ast_cache_path.write_bytes(orjson.dumps(self._ast_cache, option=orjson.OPT_NON_STR_KEYS))
         except Exception as e:
-            logger.error(f"Error analyzing {file_path}: {e}")
+            logger.error(f"Error saving AST cache: {e}")
         
-        return {}
+    def _walk_py_files(self, directory: Optional[str] = None) -> Iterator[os.DirEntry]:
+        """Recursively yield Python files under the custom nodes directory, skipping hidden entries."""
+        try:
+            with os.scandir(directory or self.custom_nodes_path) as entries:
+                for entry in entries:
+                    if entry.name.startswith("."):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        yield from self._walk_py_files(entry.path)
+                    elif entry.name.endswith(".py") and entry.is_file():
+                        yield entry
+        except FileNotFoundError:
+            # Nothing cloned yet
+            pass
+        except OSError as e:
+            logger.error(f"Error scanning {directory or self.custom_nodes_path}: {e}")
+
+    async def prewarm(self) -> None:
+        """Analyze the custom nodes up front so the first request only pays for new files."""
+        await self._analyze_node_classes()
 
     async def _analyze_node_classes(self) -> None:
-        """Analyze all Python files to find node classes and their folder requirements."""
-        python_files = self._find_python_files()
-        logger.info(f"Analyzing {len(python_files)} Python files...")
+        """Analyze all Python files in a single pass to find node classes, their folder requirements
+        and the NODE_CLASS_MAPPINGS display names. Only files changed since the last pass are parsed."""
+        async with self._analysis_lock:
+            cache_keys: List[str] = []
+            changed_files: Dict[str, str] = {}  # cache key -> path
+            for entry in self._walk_py_files():
+                try:
+                    # Files unchanged since the last run reuse their previous result
+                    stat = entry.stat()
+                except OSError as e:
+                    logger.error(f"Error analyzing {entry.path}: {e}")
+                    continue
+                cache_key = f"{entry.path}:{stat.st_mtime_ns}:{stat.st_size}"
+                cache_keys.append(cache_key)
+                if cache_key not in self._ast_cache:
+                    changed_files[cache_key] = entry.path
+            logger.info(f"Analyzing {len(cache_keys)} Python files ({len(changed_files)} changed)...")
         
-        # Use ThreadPoolExecutor for file I/O operations
-        with ThreadPoolExecutor(max_workers=min(32, os.cpu_count() * 4)) as executor:
-            loop = asyncio.get_event_loop()
-            tasks = []
-            
-            for file_path in python_files:
-                task = loop.run_in_executor(executor, self._analyze_file, file_path)
-                tasks.append(task)
-            
-            # Wait for all tasks to complete
-            results = await asyncio.gather(*tasks)
-            
-            # Process results and check for early exit
-            for class_folders in results:
-                self.node_class_folders.update(class_folders)
+            if changed_files:
+                # ast.parse holds the GIL, so parse in worker processes to use every core
+                with process_pool(
+                        len(changed_files),
+                        initializer=_init_analysis_worker,
+                        initargs=(logger.getEffectiveLevel(),)) as executor:
+                    loop = asyncio.get_running_loop()
+                    tasks = [
+                        loop.run_in_executor(executor, _analyze_file_proc, path)
+                        for path in changed_files.values()
+                    ]
                 
-                # Check if we've found all required node types
-                if self.required_node_types and all(
-                    node_type in self.node_class_folders 
-                    for node_type in self.required_node_types
-                ):
-                    logger.debug("Found all required node types, stopping analysis")
-                    break
+                    # Wait for all tasks to complete
+                    results = await asyncio.gather(*tasks)
+                
+                for analysis, records in results:
+                    for record in records:
+                        logger.handle(record)
+                self._ast_cache.update(zip(changed_files, (analysis for analysis, _ in results)))
+            
+            # Rebuild from the cache so files removed since the last pass drop out
+            node_class_folders: Dict[str, Dict[str, str]] = {}
+            node_class_mappings: Dict[str, str] = {}
+            for cache_key in cache_keys:
+                analysis = self._ast_cache[cache_key]
+                node_class_folders.update(analysis["class_folders"])
+                node_class_mappings.update(analysis["node_class_mappings"])
+            self.node_class_folders = node_class_folders
+            self.node_class_mappings = node_class_mappings
+
+            # Only rewrite the cache when a file was parsed or one has gone away
+            if changed_files or len(cache_keys) != len(self._ast_cache):
+                self._save_ast_cache(cache_keys)
 
     def _guess_model_folder(self, filename: str) -> Optional[str]:
         """Make an educated guess about which folder a model belongs in based on its filename."""
         filename_lower = filename.lower()
         
-        for pattern, folder in self.MODEL_PATTERNS.items():
-            if pattern in filename_lower:
-                logger.debug(f"Guessed folder '{folder}' for model '{filename}'")
-                return folder
+        match = first_declared_match(self._MODEL_AC, filename_lower)
+        if match:
+            pattern, folder = match
+            logger.debug(f"Guessed folder '{folder}' for model '{filename}'")
+            return folder
                 
         return None
 
     async def infer_model_paths(self, models_data: Dict) -> Dict:
         """Process models data and infer their paths"""
-        # Load node class mappings first
-        self._load_node_class_mappings()
-        
-        # Collect required node types for early exit optimization
-        self.required_node_types = {
-            self.node_class_mappings.get(node_type, node_type)  # Try to map display name to class name
-            for model in models_data.get("models", [])
-            for node_type in model["needed_by"]
-        }
-        
-        # Analyze node classes asynchronously
+        # Analyze node classes and load node class mappings asynchronously
         logger.info("Analyzing node classes...")
         await self._analyze_node_classes()
         
@@ -1,4 +1,5 @@
-import json
+import orjson
+import os
 from pathlib import Path
 from typing import Optional, Dict
 import logging
@@ -6,36 +7,91 @@ import logging
 logger = logging.getLogger("uvicorn")
 
 class ModelURLCache:
-    """Simple cache for model URLs"""
-    
-    def __init__(self, cache_file: str = "cache/.model_cache.json"):
+    """Simple cache for model URLs, persisted as an append-only JSONL journal"""
+
+    def __init__(self, cache_file: str = "cache/.model_cache.jsonl"):
         self.cache_file = Path(cache_file)
         self.cache: Dict[str, str] = {}
         self._load_cache()
-        
+
     def _load_cache(self) -> None:
-        """Load cache from file if it exists"""
-        if self.cache_file.exists():
-            try:
-                with open(self.cache_file, 'r') as f:
-                    self.cache = json.load(f)
-            except Exception as e:
-                logger.error(f"Error loading cache: {e}")
-                self.cache = {}
-                
+        """Replay the journal if it exists; later records win"""
+        if not self.cache_file.exists():
+            self._import_legacy_cache()
+            return
+
+        records = 0
+        skipped = 0
+        try:
+            with open(self.cache_file, 'rb') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    # A crash mid-append leaves a partial record; skip it rather than the whole journal
+                    try:
+                        record = orjson.loads(line)
+                        self.cache[record["k"]] = record["v"]
+                    except (orjson.JSONDecodeError, KeyError, TypeError):
+                        skipped += 1
+                        continue
+                    records += 1
+        except OSError as e:
+            logger.error(f"Error loading cache: {e}")
+            self.cache = {}
+            return
+
+        if skipped:
+            logger.warning(f"Skipped {skipped} malformed cache record(s) in {self.cache_file}")
+
+        # Compact once superseded records dominate the journal, or to drop malformed ones
+        if skipped or records > 2 * len(self.cache):
+            self._save_cache()
+
+    def _import_legacy_cache(self) -> None:
+        """Carry over the single JSON dict written by earlier versions, once"""
+        legacy_file = self.cache_file.with_suffix(".json")
+        if legacy_file == self.cache_file or not legacy_file.exists():
+            return
+        try:
+            self.cache = dict(orjson.loads(legacy_file.read_bytes()))
+        except Exception as e:
+            logger.error(f"Error importing legacy cache {legacy_file}: {e}")
+            self.cache = {}
+            return
+        logger.info(f"Imported {len(self.cache)} cached model URLs from {legacy_file}")
+        self._save_cache()
+
     def _save_cache(self) -> None:
-        """Save cache to file"""
+        """Rewrite the journal with one record per cached model"""
+        try:
+            tmp_file = self.cache_file.with_suffix(".tmp")
+            with open(tmp_file, 'wb') as f:
+                for k, v in self.cache.items():
+                    f.write(orjson.dumps({"k": k, "v": v}) + b"\n")
+            tmp_file.replace(self.cache_file)
+        except Exception as e:
+            logger.error(f"Error saving cache: {e}")
+
+    def _append(self, model_filename: str, url: str) -> None:
+        """Append a single record to the journal"""
         try:
-            with open(self.cache_file, 'w') as f:
-                json.dump(self.cache, f)
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.cache_file, 'ab+') as f:
+                # Start on a fresh line if the previous append was cut short
+                record = orjson.dumps({"k": model_filename, "v": url}) + b"\n"
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        record = b"\n" + record
+                f.write(record)
         except Exception as e:
             logger.error(f"Error saving cache: {e}")
-            
+
     def get(self, model_filename: str) -> Optional[str]:
         """Get URL for a model filename from cache"""
         return self.cache.get(model_filename)
-        
+
     def put(self, model_filename: str, url: str) -> None:
         """Add or update URL for a model filename in cache"""
         self.cache[model_filename] = url
-        self._save_cache() 
\ No newline at end of file
+        self._append(model_filename, url)
@@ -0,0 +1,25 @@
+from typing import Any, Iterable, Optional, Tuple
+import ahocorasick
+
+def build_pattern_automaton(patterns: Iterable[Tuple[str, Any]]) -> Optional[ahocorasick.Automaton]:
+    """Build an Aho-Corasick automaton over (pattern, value) pairs.
+
+    Each match carries the pattern's position so first_declared_match can keep
+    first-declared-wins semantics when several patterns hit. Returns None when there are no patterns."""
+    automaton = ahocorasick.Automaton()
+    for index, (pattern, value) in enumerate(patterns):
+        automaton.add_word(pattern, (index, pattern, value))
+    if len(automaton) == 0:
+        return None
+    automaton.make_automaton()
+    return automaton
+
+def first_declared_match(automaton: Optional[ahocorasick.Automaton], text: str) -> Optional[Tuple[str, Any]]:
+    """Return the (pattern, value) of the earliest-declared pattern found in text, or None."""
+    if automaton is None:
+        return None
+    match = min((value for _, value in automaton.iter(text)), default=None)
+    if match is None:
+        return None
+    _, pattern, value = match
+    return pattern, value
@@ -0,0 +1,12 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# The server is multi-threaded by the time work is farmed out, so workers must not be forked from it
+MP_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+
+def process_pool(task_count: int, **kwargs) -> ProcessPoolExecutor:
+    """Create a ProcessPoolExecutor with no more workers than tasks, started without forking this process."""
+    return ProcessPoolExecutor(
+        max_workers=min(os.cpu_count() or 1, task_count), mp_context=MP_CONTEXT, **kwargs)
@@ -1,7 +1,20 @@
-import subprocess
+import asyncio
+import copy
+import itertools
+import os
+import shutil
+import sys
+import ijson
+import orjson
+import xxhash
+from collections import OrderedDict
 from pathlib import Path
-from typing import List, Dict, TypedDict
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypedDict, Union
 import logging
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from operator import itemgetter
+from process_pool import process_pool
 
 logger = logging.getLogger("uvicorn")
 
@@ -19,50 +32,123 @@ class NodesData(TypedDict):
     repos: List[RepoInfo]
     models: List[ModelInfo]
 
-def extract_models_from_node(node: dict) -> list[str]:
+@dataclass(slots=True)
+class RepoEntry:
+    """Slotted accumulator for a RepoInfo while nodes are aggregated"""
+    url: str
+    needed_by: List[str] = field(default_factory=list)  # kept sorted and unique
+
+@dataclass(slots=True)
+class ModelEntry:
+    """Slotted accumulator for a ModelInfo while nodes are aggregated"""
+    filename: str
+    needed_by: List[str] = field(default_factory=list)  # kept sorted and unique
+
+def _insort_unique(items: List[str], value: str) -> None:
+    """Insert value into a sorted list unless it is already present."""
+    index = bisect_left(items, value)
+    if index == len(items) or items[index] != value:
+        items.insert(index, value)
+
+MODEL_EXTENSIONS = ('.safetensors', '.pt', '.pth', '.onnx', '.bin', '.ckpt')
+# Only the tail of a value can hold an extension, so only that much needs lowercasing
+_MODEL_EXTENSION_TAIL = -max(len(ext) for ext in MODEL_EXTENSIONS)
+
+# Shared result for the many nodes without widgets (reroutes, primitives, group nodes)
+_NO_MODELS: Sequence[str] = ()
+
+def extract_models_from_node(node: dict) -> Sequence[str]:
     """Extract model filenames from workflow data nodes' widget values."""
-    model_files = set()
-    model_extensions = ('.safetensors', '.pt', '.pth', '.onnx', '.bin', '.ckpt')
-    
-    for value in node.get("widgets_values", []):
-        if isinstance(value, str) and value.lower().endswith(model_extensions):
-            model_files.add(value)
-    
-    return list(model_files)
+    widgets_values = node.get("widgets_values")
+    if not widgets_values:
+        return _NO_MODELS
+    # dict.fromkeys dedupes while keeping widget order
+    return list(dict.fromkeys(
+        value for value in widgets_values
+        if isinstance(value, str) and value[_MODEL_EXTENSION_TAIL:].lower().endswith(MODEL_EXTENSIONS)
+    ))
+
+def _resolve_nodes(nodes: Iterable[dict], channel_manager) -> list[dict]:
+    """Resolve the repo and models of each node; group nodes must already be filtered out."""
+    results = [
+        {
+            # Intern so every record of a type shares one string and later set/dict lookups hit by identity
+            "type": sys.intern(node["type"]),
+            "model": extract_models_from_node(node)
+        }
+        for node in nodes
+    ]
+
+    # Node types repeat heavily, so resolve each distinct type once in a single batch
+    type_to_repo = channel_manager.get_repos_for_types({result["type"] for result in results})
+    for result in results:
+        result["repo"] = type_to_repo[result["type"]]
+           
+    return sorted(results, key=itemgetter("type"))
+
+def _workflow_nodes(workflow_data: dict) -> Iterator[dict]:
+    """Yield the non-group nodes of a workflow, top-level first, then those inside group node definitions."""
+    nodes_list = workflow_data.get("nodes") or ()
+    extra = workflow_data.get("extra") or {}
+    group_nodes = extra.get("groupNodes") or {}
+
+    # Collect all group node types first so group nodes are dropped before any work is done on them
+    group_node_types = set(group_nodes)
+
+    yield from (node for node in nodes_list if node["type"] not in group_node_types)
+    yield from (
+        node for group_data in group_nodes.values() for node in group_data.get("nodes") or ()
+        if node["type"] not in group_node_types
+    )
 
 def extract_nodes(workflow_data: dict, channel_manager) -> list[dict]:
     """Extract unique node types from workflow data, excluding group nodes."""
-    node_types = set()
-    group_node_types = set()
-    all_nodes = []  # Changed to list instead of set
+    return _resolve_nodes(_workflow_nodes(workflow_data), channel_manager)
 
-    # Add all nodes in the workflow
-    all_nodes.extend(workflow_data.get("nodes", []))
-    
-    # Collect all group node types
-    for group_name, group_data in workflow_data.get("extra", {}).get("groupNodes", {}).items():
+def extract_nodes_streaming(fileobj: BinaryIO, channel_manager) -> list[dict]:
+    """Extract nodes like extract_nodes, but straight from a seekable workflow JSON file
+    without materializing the whole workflow dict."""
+    # Group node types must be known before filtering, so read them in a first pass
+    group_node_types = set()
+    group_nodes = []
+    for group_name, group_data in ijson.kvitems(fileobj, "extra.groupNodes"):
         group_node_types.add(group_name)
-        all_nodes.extend(group_data.get("nodes", []))
+        group_nodes.extend(group_data.get("nodes") or ())
 
-    results = []
-    for node in all_nodes:
-        node_type = node["type"]
-        if node_type in group_node_types:
-            continue
-
-        repo = channel_manager.get_repo_from_node_type(node_type)
-        model = extract_models_from_node(node)
-        node_types.add(node_type)
-        results.append({
-            "type": node_type,
-            "model": model,
-            "repo": repo
-        })
-           
-    return sorted(results, key=lambda x: x["type"])
+    # Then stream the top-level nodes one at a time
+    fileobj.seek(0)
+    all_nodes = (
+        node for node in itertools.chain(ijson.items(fileobj, "nodes.item"), group_nodes)
+        if node["type"] not in group_node_types
+    )
+    return _resolve_nodes(all_nodes, channel_manager)
 
 def transform_nodes_data(nodes: list[dict]) -> NodesData:
     """Transform nodes data into a structured format with node types, repos, and models."""
+    return _aggregate_nodes((node["type"], node["model"], node["repo"]) for node in nodes)
+
+def build_nodes_data(workflow_data: dict, channel_manager) -> NodesData:
+    """Build NodesData straight from a workflow, equivalent to
+    transform_nodes_data(extract_nodes(...)) without the per-node intermediate records."""
+    # Single pass over the nodes, bucketing model filenames by node type in node order
+    models_by_type: Dict[str, List[str]] = {}
+    for node in _workflow_nodes(workflow_data):
+        node_type = sys.intern(node["type"])
+        if (type_models := models_by_type.get(node_type)) is None:
+            models_by_type[node_type] = list(extract_models_from_node(node))
+        else:
+            type_models.extend(extract_models_from_node(node))
+
+    type_to_repo = channel_manager.get_repos_for_types(models_by_type)
+
+    # Visiting distinct types in sorted order yields the same ordering as the sorted per-node records
+    return _aggregate_nodes(
+        (node_type, models_by_type[node_type], type_to_repo[node_type])
+        for node_type in sorted(models_by_type)
+    )
+
+def _aggregate_nodes(nodes: Iterable[Tuple[str, Sequence[str], Optional[str]]]) -> NodesData:
+    """Aggregate (node type, model filenames, repo) records into NodesData."""
     result: NodesData = {
         "node_types": [],
         "unmapped_nodes": [],
@@ -70,49 +156,151 @@ def transform_nodes_data(nodes: list[dict]) -> NodesData:
         "models": []
     }
     
-    # Collect unique node types
-    node_types = sorted(list(set(node["type"] for node in nodes)))
-    result["node_types"] = node_types
-    
-    # Collect unmapped nodes (nodes without repo)
-    result["unmapped_nodes"] = sorted(list(set(node["type"] for node in nodes if node["repo"] is None)))
-    
-    # Build repos mapping
-    repos_dict = {}
-    for node in nodes:
-        if node["repo"]:
-            if node["repo"] not in repos_dict:
-                repos_dict[node["repo"]] = {"url": node["repo"], "needed_by": set()}
-            repos_dict[node["repo"]]["needed_by"].add(node["type"])
-    
-    # Convert sets to sorted lists for JSON serialization
-    for repo in repos_dict.values():
-        repo["needed_by"] = sorted(list(repo["needed_by"]))
-    result["repos"] = list(repos_dict.values())
+    # Collect node types, unmapped nodes, repos and models in a single pass
+    node_types = set()
+    unmapped_nodes = set()
+    repos_dict: Dict[str, RepoEntry] = {}
+    models_dict: Dict[str, ModelEntry] = {}
+    for node_type, models, repo in nodes:
+        node_types.add(node_type)
+        
+        if repo is None:
+            unmapped_nodes.add(node_type)
+        elif repo:
+            if (repo_entry := repos_dict.get(repo)) is None:
+                repo_entry = repos_dict[repo] = RepoEntry(repo)
+            _insort_unique(repo_entry.needed_by, node_type)
+        
+        for model in models:
+            if (model_entry := models_dict.get(model)) is None:
+                model_entry = models_dict[model] = ModelEntry(model)
+            _insort_unique(model_entry.needed_by, node_type)
     
-    # Build models mapping
-    models_dict = {}
-    for node in nodes:
-        for model in node["model"]:
-            if model not in models_dict:
-                models_dict[model] = {"filename": model, "needed_by": set()}
-            models_dict[model]["needed_by"].add(node["type"])
+    result["node_types"] = sorted(node_types)
+    result["unmapped_nodes"] = sorted(unmapped_nodes)
     
-    # Convert sets to sorted lists for JSON serialization
-    for model in models_dict.values():
-        model["needed_by"] = sorted(list(model["needed_by"]))
-    result["models"] = list(models_dict.values())
+    # Convert entries to plain dicts for JSON serialization; needed_by is already sorted
+    result["repos"] = [
+        {"url": repo.url, "needed_by": repo.needed_by} for repo in repos_dict.values()
+    ]
+    result["models"] = [
+        {"filename": model.filename, "needed_by": model.needed_by} for model in models_dict.values()
+    ]
     
     return result
 
-async def clone_repos(repos: List[RepoInfo]) -> None:
-    """Clone repositories if they don't exist."""
-    Path("custom_nodes").mkdir(parents=True, exist_ok=True)
-    for repo in repos:
+# Recent get_nodes_data results, keyed by workflow digest and channel mapping version
+NODES_DATA_CACHE_SIZE = 128
+_nodes_data_cache: "OrderedDict[str, NodesData]" = OrderedDict()
+
+def _workflow_digest(workflow_data: dict) -> str:
+    """Hash only the parts of a workflow that affect its NodesData."""
+    nodes_list = workflow_data.get("nodes") or ()
+    extra = workflow_data.get("extra") or {}
+    group_nodes = extra.get("groupNodes") or {}
+    relevant = {
+        "nodes": [(node["type"], node.get("widgets_values")) for node in nodes_list],
+        "groupNodes": {
+            group_name: [(node["type"], node.get("widgets_values")) for node in group_data.get("nodes") or ()]
+            for group_name, group_data in group_nodes.items()
+        },
+    }
+    return xxhash.xxh3_128_hexdigest(orjson.dumps(relevant, option=orjson.OPT_SORT_KEYS))
+
+def get_nodes_data(workflow_data: dict, channel_manager) -> NodesData:
+    """Extract and transform the nodes of a workflow, reusing the result for repeat uploads."""
+    key = f"{_workflow_digest(workflow_data)}:{channel_manager.version_tag}"
+    if (nodes_data := _nodes_data_cache.get(key)) is not None:
+        logger.debug("Reusing nodes data for previously processed workflow")
+        _nodes_data_cache.move_to_end(key)
+    else:
+        nodes_data = build_nodes_data(workflow_data, channel_manager)
+        _nodes_data_cache[key] = nodes_data
+        if len(_nodes_data_cache) > NODES_DATA_CACHE_SIZE:
+            _nodes_data_cache.popitem(last=False)
+
+    # Callers are free to modify what they get back
+    return copy.deepcopy(nodes_data)
+
+# ChannelManager of a process_workflows_batch worker, set once per process by _init_batch_worker
+_worker_channel_manager = None
+
+def _init_batch_worker(channel_manager_cls: type, channel_manager_state: dict) -> None:
+    global _worker_channel_manager
+    _worker_channel_manager = channel_manager_cls.from_state(channel_manager_state)
+
+def _process_workflow_file(path: str) -> NodesData:
+    workflow_data = orjson.loads(Path(path).read_bytes())
+    return build_nodes_data(workflow_data, _worker_channel_manager)
+
+def process_workflows_batch(paths: Iterable[Union[str, Path]], channel_manager,
+                            chunksize: int = 16) -> List[NodesData]:
+    """Extract and transform the nodes of many workflow files in parallel worker processes."""
+    paths = [str(path) for path in paths]
+    if not paths:
+        return []
+
+    # The channel manager state is shipped once per worker rather than with every task
+    with process_pool(
+            len(paths),
+            initializer=_init_batch_worker,
+            initargs=(type(channel_manager), channel_manager.to_state())) as executor:
+        return list(executor.map(_process_workflow_file, paths, chunksize=chunksize))
+
+# An absolute executable path is one of the conditions for subprocess to use posix_spawn
+_GIT_EXECUTABLE = shutil.which("git") or "git"
+
+async def _run_git(*args: str) -> Optional[str]:
+    """Run a git command, returning its stderr if it failed."""
+    # close_fds=False (with no preexec_fn, cwd or pass_fds) lets subprocess use posix_spawn
+    # instead of fork+exec, avoiding copying this process's page tables for every clone.
+    # Python-created descriptors are non-inheritable anyway (PEP 446).
+    proc = await asyncio.create_subprocess_exec(
+        _GIT_EXECUTABLE, *args,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+        close_fds=False)
+    _, stderr = await proc.communicate()
+    if proc.returncode != 0:
+        return stderr.decode(errors='replace').strip()
+    return None
+
+async def clone_repos(repos: List[RepoInfo], max_concurrency: int = 8,
+                      shallow_submodules: bool = True) -> None:
+    """Clone repositories concurrently if they don't exist."""
+    base = Path("custom_nodes")
+    base.mkdir(parents=True, exist_ok=True)
+    # One directory listing instead of a stat per repo
+    existing = {entry.name for entry in os.scandir(base)}
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _clone_one(repo: RepoInfo) -> None:
         repo_url = repo["url"]
-        repo_path = Path(f"custom_nodes/{repo_url.split('/')[-1]}")
-        if not repo_path.exists():
+        name = repo_url.rsplit('/', 1)[-1]
+        if name in existing:
+            return
+        # Claim the name before yielding so duplicate URLs don't clone twice
+        existing.add(name)
+        repo_path = base / name
+        async with semaphore:
+            # Partial, tag-less clone: only the tree needed for the checkout crosses the wire
             logger.info(f"Cloning repository {repo_url}...")
-            subprocess.run([
-                "git", "clone", "--depth", "1", "--recurse-submodules",
-                repo_url, str(repo_path)]) 
\ No newline at end of file
+            if error := await _run_git(
+                    "clone", "--depth", "1", "--no-tags", "--filter=blob:none",
+                    repo_url, str(repo_path)):
+                logger.error(f"Failed to clone {repo_url}: {error}")
+                return
+
+            # Submodules are a separate step, only taken by repos that actually have them
+            if (repo_path / ".gitmodules").exists():
+                logger.info(f"Initializing submodules for {repo_url}...")
+                args = ["-C", str(repo_path), "submodule", "update", "--init", "--recursive"]
+                if shallow_submodules:
+                    args += ["--depth", "1"]
+                if error := await _run_git(*args):
+                    logger.error(f"Failed to initialize submodules for {repo_url}: {error}")
+
+    results = await asyncio.gather(*[_clone_one(repo) for repo in repos], return_exceptions=True)
+    for repo, result in zip(repos, results):
+        if isinstance(result, Exception):
+            logger.error(f"Failed to clone {repo['url']}: {result}")